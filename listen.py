@@ -1,4 +1,4 @@
-from queue import Empty
+from queue import Queue
 from soco.events import event_listener
 import logging
 logging.basicConfig()
@@ -9,30 +9,27 @@ from soco.events import event_listener
 # the group coordinator
 device = soco.discover().pop().group.coordinator
 print (device.player_name)
-sub = device.renderingControl.subscribe()
-sub2 = device.avTransport.subscribe()
+# both subscriptions deliver into one queue so we can block on it
+events = Queue()
+sub = device.renderingControl.subscribe(event_queue=events)
+sub2 = device.avTransport.subscribe(event_queue=events)
 
 while True:
     try:
-        event = sub.events.get(timeout=0.5)
-        pprint ("** renderingControl **")
-        pprint (event.variables)
-        # {'volume': {'LF': '100', 'Master': '6', 'RF': '100'}}
-    except Empty:
-        pass
-    try:
-        event = sub2.events.get(timeout=0.5)
-        pprint ("** avTransport **")
-        pprint (event.variables)
-        # 'transport_state': 'PAUSED_PLAYBACK
-        # 'transport_state': 'TRANSITIONING'
-        # 'transport_state': 'PLAYING'
-    except Empty:
-        pass
+        event = events.get()
+        if event.sid == sub.sid:
+            pprint ("** renderingControl **")
+            pprint (event.variables)
+            # {'volume': {'LF': '100', 'Master': '6', 'RF': '100'}}
+        else:
+            pprint ("** avTransport **")
+            pprint (event.variables)
+            # 'transport_state': 'PAUSED_PLAYBACK
+            # 'transport_state': 'TRANSITIONING'
+            # 'transport_state': 'PLAYING'
 
     except KeyboardInterrupt:
         sub.unsubscribe()
         sub2.unsubscribe()
         event_listener.stop()
         break
-
@@ -28,18 +28,32 @@ import threading
 import time
 import logging
 import json
-import requests
 import resource
 import sys
 import socket
 import os
 import random
-from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
-from socketserver import ThreadingMixIn 
+import functools
+import heapq
+import bisect
+import re
+import mmap
+import multiprocessing
+from urllib.parse import quote, unquote
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from RangeHTTPServer import RangeRequestHandler  # type: ignore
-from queue import Empty
+from queue import Empty, Queue
+from collections import deque, OrderedDict
 from soco.events import event_listener
 import soco # type: ignore
+try:
+    import orjson # type: ignore
+except ImportError:
+    orjson = None
+try:
+    import msgpack # type: ignore
+except ImportError:
+    msgpack = None
 
 BUILD = "0.0.13"
 
@@ -47,15 +61,26 @@ BUILD = "0.0.13"
 APIPORT = 8001
 MEDIAPORT = 54000
 DEBUGMODE = False
+LOGLEVEL = "WARNING"         # Logging level - DEBUG shows request tracing
 MEDIAPATH = "/Volumes/Plex"  # Location of media files
 MAXPAYLOAD = 4000            # Reject payload if above this size
 DROPPREFIX = "/media"        # Optional - Omit media filename prefix
+HTTPTHREADS = 16             # Worker threads per HTTP server
+HTTPTIMEOUT = 30             # Seconds an idle connection may hold a worker
+MEDIAPROCS = 1               # Media server processes sharing MEDIAPORT
+SPEAKERSTTL = 5              # Seconds to reuse /speakers discovery
+ARTTTL = 60                  # Seconds between album-art folder rescans
+VOLUMETTL = 5                # Seconds to trust the cached group volume
 
 # Environment config
 M3UPATH = os.getenv("M3UPATH", MEDIAPATH) 
 MEDIAPATH = os.getenv("MEDIAPATH", MEDIAPATH) 
 MEDIAHOST = os.getenv("MEDIAHOST", None) 
 DROPPREFIX = os.getenv("DROPPREFIX", DROPPREFIX) 
+HTTPTHREADS = int(os.getenv("HTTP_THREAD_POOL", HTTPTHREADS))
+HTTPTIMEOUT = int(os.getenv("HTTP_TIMEOUT", HTTPTIMEOUT))
+MEDIAPROCS = int(os.getenv("MEDIAPROCS", MEDIAPROCS))
+LOGLEVEL = os.getenv("LOGLEVEL", LOGLEVEL).upper()
 
 # Static Assets
 web_root = os.path.join(os.path.dirname(__file__), "web")
@@ -99,7 +124,7 @@ serverstats['api'] = {}
 serverstats['ts'] = int(time.time())         # Timestamp for Now
 serverstats['start'] = int(time.time())      # Timestamp for Start 
 playlists = {}
-musicqueue = []     # Jukebox queue of music files
+musicqueue = deque()  # Jukebox queue of music files
 zone = None         # Zone to use
 state = None
 repeat = False
@@ -114,17 +139,57 @@ db_albums = {}
 db_artists = {}
 db_songs = {}
 db_songkey = {}
+db_recent = b"[]"  # JSON of most recently added albums
+db_albums_sorted = []   # Album titles sorted case-insensitive
+db_albums_lower = []    # Lowercase of db_albums_sorted for bisect
 
 # Global Variables
 running = True
-
-# Set up Sonos
-sonos = list(soco.discover())[0]
-sonos = sonos.group.coordinator
-zone = sonos.ip_address
+sonos = None            # Sonos coordinator - see get_sonos()
+_SONOS_LOCK = threading.Lock()
+_api_server = None      # HTTP servers - kept for shutdown()
+_speakers_cache = {'ts': 0, 'data': None}   # /speakers response
+_coord_cache = {}       # zone ip -> group coordinator
+_album_art = {'ts': 0, 'mtime': None, 'keys': frozenset()}
+_album_songs = {}       # album id -> (album-art keys, queue entries)
+_speakers_lock = threading.Lock()
+_volume = {'ts': 0, 'ip': None, 'value': None}  # group volume of sonos
+_jukebox = {'reset': False, 'transport': None}   # playback changed by API
+_media_server = None
 
 # Helpful Functions
 
+class SonosUnavailable(RuntimeError):
+    """No Sonos coordinator - none found or discovery already running"""
+
+def tojson(value):
+    """Return value serialized as JSON bytes - uses orjson if available"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value).encode("utf8")
+
+def tojson_stream(items, bufsize=65536):
+    """Yield JSON array of items as bytes chunks of about bufsize"""
+    buf = bytearray(b"[")
+    sep = b""
+    for item in items:
+        buf += sep
+        buf += tojson(item)
+        sep = b","
+        if len(buf) >= bufsize:
+            yield bytes(buf)
+            buf.clear()
+    buf += b"]"
+    yield bytes(buf)
+
+# Pre-serialized API responses
+RESP_OK = tojson({"Response": "OK"})
+RESP_NULL = tojson(None)
+RESP_NEXT_EMPTY = tojson({"Response": "Sent Next - Playlist Empty"})
+RESP_PLAYLIST_EMPTY = tojson({"Response": "Playlist Empty"})
+RESP_NO_SONOS = tojson({"Response": "Error: No Sonos speakers found"})
+RESP_ADDED_ONE = tojson({"Response": "Added 1 Song"})
+
 def formatreturn(value):
     if value is None:
         result = {"status": "OK"}
@@ -149,7 +214,7 @@ def get_static(web_root, fpath):
             ftype = CTMAP[ext]
         else:
             ftype = 'text/plain'
-        print("MEDIA: url = {} contenttype = {}".format(fpath,ftype))
+        log.debug("MEDIA: url = %s contenttype = %s", fpath, ftype)
         with open(freq, 'rb') as f:
             return f.read(), ftype
     return None, None
@@ -162,97 +227,326 @@ def detect_ip_address():
     s.close()
     return ip_address
 
+@functools.lru_cache(maxsize=1)
+def get_mediahost():
+    """Return the media host address - MEDIAHOST or detected on first use"""
+    if MEDIAHOST is None:
+        return detect_ip_address()
+    return MEDIAHOST
+
+@functools.lru_cache(maxsize=1)
+def get_mediaurl():
+    """Return the media server base URL - fixed for the server lifetime"""
+    return "http://%s:%d" % (get_mediahost(), MEDIAPORT)
+
+def album_art_keys():
+    """Return set of album keys with album-art - rescanned every ARTTTL"""
+    now = time.time()
+    if now - _album_art['ts'] >= ARTTTL:
+        _album_art['ts'] = now
+        path = "%s/album-art" % MEDIAPATH
+        try:
+            # folder mtime changes when art is added or removed
+            mtime = os.stat(path).st_mtime_ns
+            if mtime != _album_art['mtime']:
+                _album_art['keys'] = frozenset(os.path.splitext(f)[0]
+                    for f in os.listdir(path) if f.endswith(".png"))
+                _album_art['mtime'] = mtime
+        except OSError:
+            _album_art['keys'] = frozenset()
+            _album_art['mtime'] = None
+    return _album_art['keys']
+
+def album_art_url(akey):
+    """Return media URL for album art of akey or None if not found"""
+    if akey and str(akey) in album_art_keys():
+        return "%s/album-art/%s.png" % (get_mediaurl(), akey)
+    return None
+
+def album_songs(album_id):
+    """Return tuple of queue entries for album_id (None if not in db)"""
+    artkeys = album_art_keys()
+    cached = _album_songs.get(album_id)
+    if cached is not None and cached[0] is artkeys:
+        return cached[1]
+    album = db.get(album_id)
+    if album is None:
+        return None
+    akey = album["key"]
+    mediaurl = get_mediaurl()
+    album_art = album_art_url(akey)
+    songs = tuple({
+        'title': s['song'],
+        'artist': s['artist'],
+        'length': s['length'],
+        'album': album['title'],
+        'albumartist': album['artist'],
+        'path': mediaurl + quote(s['path'][0]),
+        'album_art': album_art,
+        'akey': akey,
+        'skey': s['key'],
+    } for s in album["tracks"].values())
+    # entries are shared with musicqueue - never modify them in place
+    _album_songs[album_id] = (artkeys, songs)
+    return songs
+
+def get_coordinator(ip):
+    """Return group coordinator for zone ip - cached until /setzone or /rescan"""
+    c = _coord_cache.get(ip)
+    if c is None:
+        c = soco.SoCo(ip).group.coordinator
+        _coord_cache[ip] = c
+    return c
+
+def get_volume(sonos):
+    """Return group volume of sonos - read from speaker at most every VOLUMETTL"""
+    if (_volume['ip'] != sonos.ip_address or _volume['value'] is None or
+            time.time() - _volume['ts'] >= VOLUMETTL):
+        _volume['value'] = sonos.group.volume
+        _volume['ip'] = sonos.ip_address
+        _volume['ts'] = time.time()
+    return _volume['value']
+
+def set_volume(sonos, vol):
+    """Set group volume of sonos (0-100) and remember it"""
+    vol = max(0, min(100, vol))
+    sonos.group.volume = vol
+    _volume['value'] = vol
+    _volume['ip'] = sonos.ip_address
+    _volume['ts'] = time.time()
+
+def jukebox_reset(transport=None):
+    """Replace jukebox's event-cached transport state after an API command
+       (None makes it read the live state before advancing)"""
+    _jukebox['transport'] = transport
+    _jukebox['reset'] = True
+
+def get_sonos(rescan=False):
+    """Return the Sonos coordinator - discovered on first use or on rescan
+    (one attempt - raises SonosUnavailable rather than wait; jukebox retries)"""
+    global sonos, zone
+    if sonos is not None and not rescan:
+        return sonos
+    # never queue request threads behind a discovery already running
+    if not _SONOS_LOCK.acquire(blocking=False):
+        if sonos is not None:
+            return sonos
+        raise SonosUnavailable("Sonos discovery in progress")
+    try:
+        if sonos is None or rescan:
+            devices = soco.discover()
+            if not devices:
+                raise SonosUnavailable("No Sonos speakers found")
+            # pick by name so the same zone is chosen on every start
+            sonos = min(devices, key=lambda d: d.player_name)
+            sonos = sonos.group.coordinator
+            zone = sonos.ip_address
+    finally:
+        _SONOS_LOCK.release()
+    return sonos
+
+def load_db_json():
+    """ Load database and index from the db.*.json export files """
+    global db, db_added, db_albums, db_artists, db_songs, db_songkey
+    f = open("%s/db.json" % MEDIAPATH, "rb")
+    db = json.load(f)
+    f = open("%s/db.added.json" % MEDIAPATH, "rb")
+    db_added = json.load(f)
+    f = open("%s/db.albums.json" % MEDIAPATH, "rb")
+    db_albums = json.load(f)
+    f = open("%s/db.artists.json" % MEDIAPATH, "rb")
+    db_artists = json.load(f)
+    f = open("%s/db.songs.json" % MEDIAPATH, "rb")
+    db_songs = json.load(f)
+    f = open("%s/db.songkey.json" % MEDIAPATH, "rb")
+    db_songkey = json.load(f)
+
+def load_db_snapshot():
+    """ Load database and index from db.msgpack - False if not usable """
+    global db, db_added, db_albums, db_artists, db_songs, db_songkey
+    snapshot = "%s/db.msgpack" % MEDIAPATH
+    if msgpack is None or not os.path.isfile(snapshot):
+        return False
+    # Ignore a snapshot older than the JSON export it was built from
+    dbfile = "%s/db.json" % MEDIAPATH
+    if os.path.isfile(dbfile) and os.path.getmtime(dbfile) > os.path.getmtime(snapshot):
+        return False
+    try:
+        with open(snapshot, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                data = msgpack.unpackb(buf, use_list=False)
+        tables = (data["db"], data["added"], data["albums"], data["artists"],
+                  data["songs"], data["songkey"])
+    except (OSError, ValueError, KeyError, TypeError, msgpack.UnpackException) as e:
+        # truncated or stale format - fall back to the JSON export
+        log.warning("Ignoring unusable %s: %s", snapshot, e)
+        return False
+    db, db_added, db_albums, db_artists, db_songs, db_songkey = tables
+    return True
+
 def load_db():
     """ Load database and index """
-    global db, db_added, db_albums, db_artists, db_songs, db_songkey
+    global db, db_added, db_albums, db_artists, db_songs, db_songkey, db_recent
+    global db_albums_sorted, db_albums_lower
     try:
-        f = open("%s/db.json" % MEDIAPATH)
-        db = json.load(f)
-        f = open("%s/db.added.json" % MEDIAPATH)
-        db_added = json.load(f)
-        f = open("%s/db.albums.json" % MEDIAPATH)
-        db_albums = json.load(f)
-        f = open("%s/db.artists.json" % MEDIAPATH)
-        db_artists = json.load(f)
-        f = open("%s/db.songs.json" % MEDIAPATH)
-        db_songs = json.load(f)
-        f = open("%s/db.songkey.json" % MEDIAPATH)
-        db_songkey = json.load(f)
+        if not load_db_snapshot():
+            load_db_json()
+        # Top 50 recently added albums - [timestamp, key] pairs, or a
+        # timestamp to key dict from older exports
+        if isinstance(db_added, dict):
+            recent = [db_added[a] for a in heapq.nlargest(50, db_added, key=float)]
+        else:
+            recent = [a[1] for a in heapq.nlargest(50, db_added)]
+        albums = []
+        for album_id in recent:
+            album = db[str(album_id)]
+            album["key"] = album_id
+            albums.append(album)
+        db_recent = tojson(albums)
+        # Sorted album titles for prefix search
+        db_albums_sorted = sorted(db_albums, key=str.lower)
+        db_albums_lower = [t.lower() for t in db_albums_sorted]
+        album_art_keys()
     except:
         pass
 
-# Determine my Hostname
-if MEDIAHOST is None:
-    MEDIAHOST = detect_ip_address()
-
 # Parse file contents of file with m3u or m3u8 extension
 #  Return array of dict {'length': None, 'title': None, 'path': None}
+#  Single regex pass over the file: group 1 is the directive (empty for a
+#  media path line) and group 2 is the remainder of the line.
+_M3U_RE = re.compile(r'^[^\S\n]*(#EXTINF:|#EXTALB:|#EXTART:|#PLEX|#|)(.*?)[^\S\n]*$', re.M)
+_M3U_CACHE_SIZE = 128
+_m3u_cache = OrderedDict()   # (m3u_file, mtime_ns) -> parsed playlist
+_m3u_cache_lock = threading.Lock()
+
 def parse_m3u(m3u_file):
+    """Return parsed playlist - cached until the file is modified"""
+    key = (m3u_file, os.stat(m3u_file).st_mtime_ns)
+    with _m3u_cache_lock:
+        playlist = _m3u_cache.get(key)
+        if playlist is not None:
+            _m3u_cache.move_to_end(key)
+            return list(playlist)
+    playlist = _parse_m3u_file(m3u_file)
+    with _m3u_cache_lock:
+        _m3u_cache[key] = playlist
+        if len(_m3u_cache) > _M3U_CACHE_SIZE:
+            _m3u_cache.popitem(last=False)
+    return list(playlist)
+
+def _parse_m3u_file(m3u_file):
     with open(m3u_file, "r") as infile:
         if m3u_file.lower().endswith(".m3u") or m3u_file.lower().endswith(".m3u8"):
             line = infile.readline()
             if not line.startswith("#EXTM3U"):
-                log.debug("File '{}' lacks '#EXTM3U' as first line".format(m3u_file))
+                log.debug("File '%s' lacks '#EXTM3U' as first line", m3u_file)
                 return []
-        playlist = []
-        id = 0
-        song = {'id': id, 'length': None, 'title': None, 'path': None, 'album': None, 'artist': None, 'albumartist': None, 'skey': None, 'akey': None}
-        for line in infile:
-            line = line.strip()
-            if line.startswith("#EXTINF:"):  # song artist - title
-                length, title = line.split("#EXTINF:")[1].split(",", 1)
-                song['length'] = length
-                artist = None
-                if " - " in title:
-                    pak = title.split(" - ")
-                    artist=pak[0]
-                    title=pak[1]
-                song['title'] = title
-                song['artist'] = artist
-            elif line.startswith("#PLEX"): # Plex index keys
-                #PLEX ALBUM=33,SONG=38
-                vals = line.split(",")
-                song['akey'] = int(vals[0].split("=")[1])
-                song['skey'] = int(vals[1].split("=")[1])
-            elif line.startswith("#EXTALB:"): # album
-                album = line.split("#EXTALB:")[1]
-                song['album'] = album
-            elif line.startswith("#EXTART:"): # album artist
-                albumartist = line.split("#EXTART:")[1]
-                song['albumartist'] = albumartist
-            elif line.startswith("#"):
-                # Ignore comment lines
-                pass
-            elif len(line) != 0:
-                id = id + 1
-                song['path'] = line
-                # TODO: Restrict to only MEDIAPATH
-                playlist.append(song)
-                song = {'id': id, 'length': None, 'title': None, 'path': None, 'album': None, 'artist': None, 'albumartist': None, 'skey': None, 'akey': None}
-        return playlist
+        data = infile.read()
+    playlist = []
+    id = 0
+    song = {'id': id, 'length': None, 'title': None, 'path': None, 'album': None, 'artist': None, 'albumartist': None, 'skey': None, 'akey': None}
+    for tag, value in _M3U_RE.findall(data):
+        if tag == "#EXTINF:":  # song artist - title
+            length, title = value.split(",", 1)
+            song['length'] = length
+            artist = None
+            if " - " in title:
+                pak = title.split(" - ")
+                artist=pak[0]
+                title=pak[1]
+            song['title'] = title
+            song['artist'] = artist
+        elif tag == "#PLEX": # Plex index keys
+            #PLEX ALBUM=33,SONG=38
+            vals = value.split(",")
+            song['akey'] = int(vals[0].split("=")[1])
+            song['skey'] = int(vals[1].split("=")[1])
+        elif tag == "#EXTALB:": # album
+            song['album'] = value
+        elif tag == "#EXTART:": # album artist
+            song['albumartist'] = value
+        elif tag == "#":
+            # Ignore comment lines
+            pass
+        elif len(value) != 0:
+            id = id + 1
+            song['path'] = value
+            # TODO: Restrict to only MEDIAPATH
+            playlist.append(song)
+            song = {'id': id, 'length': None, 'title': None, 'path': None, 'album': None, 'artist': None, 'albumartist': None, 'skey': None, 'akey': None}
+    return playlist
 
 # Scan path for m3u and m3u8 files
-#  Return array of playlist m3u files 
+#  Return array of playlist m3u files - cached until the folder changes
+_M3U_EXT = (".m3u", ".m3u8")
+_m3u_list_cache = {}    # (path, mtime_ns) -> list of m3u files
+
 def list_m3u(path):
-    m3u = []
-    ext = (".m3u",".m3u8")
+    global _m3u_list_cache
     if path.endswith("/"):
         path = path[:-1]
-    for file in os.listdir(path):
-        if file.lower().endswith(tuple(ext)):
-            m3u.append(file)
+    key = (path, os.stat(path).st_mtime_ns)
+    m3u = _m3u_list_cache.get(key)
+    if m3u is None:
+        with os.scandir(path) as entries:
+            m3u = [e.name for e in entries
+                   if e.name.lower().endswith(_M3U_EXT) and e.is_file()]
+        _m3u_list_cache = {key: m3u}
     return m3u
 
 
 # Handlers
 
-class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
-    daemon_threads = True
-    pass
+class ThreadPoolMixIn:
+    """Mix-in class to handle requests on a fixed pool of daemon threads"""
+    pool_size = HTTPTHREADS
+
+    def server_activate(self):
+        super().server_activate()
+        self._requests = Queue()
+        for _ in range(self.pool_size):
+            threading.Thread(target=self._pool_worker, daemon=True).start()
+
+    def process_request(self, request, client_address):
+        self._requests.put((request, client_address))
+
+    def _pool_worker(self):
+        while True:
+            request, client_address = self._requests.get()
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+class ThreadingHTTPServer(ThreadPoolMixIn, HTTPServer):
+    sndbuf = None       # SO_SNDBUF for accepted sockets (None = OS default)
+
+    def get_request(self):
+        # no Nagle delay on small writes, keepalive to drop dead clients
+        request, client_address = super().get_request()
+        request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        request.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if self.sndbuf:
+            request.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf)
+        return request, client_address
+
+class MediaHTTPServer(ThreadingHTTPServer):
+    """Media server - SO_REUSEPORT lets MEDIAPROCS processes share the port"""
+    sndbuf = 1024 * 1024
+
+    def server_bind(self):
+        if MEDIAPROCS > 1 and hasattr(socket, "SO_REUSEPORT"):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
 
 ## MEDIA Server Handler
 
 class mediahandler(RangeRequestHandler):
+    # drop idle or stalled clients so they can't pin a pool worker
+    timeout = HTTPTIMEOUT
+
     def __init__(self, *args, **kwargs):
         self.extensions_map = CTMAP
         super().__init__(*args, directory=MEDIAPATH, **kwargs)
@@ -272,19 +566,36 @@ class mediahandler(RangeRequestHandler):
         return host
 
     def do_GET(self):
-        print("GET - Path = {}".format(self.path))
-        #self.path = requests.utils.unquote(self.path.replace(DROPPREFIX, MEDIAPATH))
+        log.debug("GET - Path = %s", self.path)
+        #self.path = unquote(self.path.replace(DROPPREFIX, MEDIAPATH))
         self.path = self.path.replace(DROPPREFIX, "")
-        print("    - converted Path = {}".format(self.path))
+        log.debug("    - converted Path = %s", self.path)
         try:
             super().do_GET()
         except Exception as e:
             # It's normal to hit some exceptions with Sonos
-            print("Exception ignored: {}".format(e))
+            log.debug("Exception ignored: %s", e)
+
+    def copyfile(self, source, outputfile):
+        # send file body (or byte range) from the kernel with sendfile()
+        try:
+            source.fileno()
+        except (AttributeError, OSError):
+            return super().copyfile(source, outputfile)
+        start, stop = getattr(self, "range", None) or (None, None)
+        start = start or 0
+        count = None if stop is None else stop - start + 1
+        outputfile.flush()
+        self.connection.sendfile(source, start, count)
 
 ## API Server Handler
 
 class apihandler(BaseHTTPRequestHandler):
+    # drop idle clients (e.g. browser preconnects) so they can't pin a worker
+    timeout = HTTPTIMEOUT
+    # buffer wfile so headers and body go out in one send (flushed in finish)
+    wbufsize = 64 * 1024
+
     def log_message(self, format, *args):
         if DEBUGMODE:
             sys.stderr.write("%s - - [%s] %s\n" %
@@ -299,265 +610,345 @@ class apihandler(BaseHTTPRequestHandler):
         host, hostport = self.client_address[:2]
         return host
 
-    def do_GET(self):
-        global musicqueue, zone, sonos, shuffle, repeat, state, stop, playing
-        global db, db_added, db_albums, db_artists, db_songs, db_songkey
-        self.send_response(200)
-        message = json.dumps({"Response": "OK"})
-        contenttype = 'application/json'
-        if self.path== '/current':
-            # What is currently playing
-            sonos = soco.SoCo(zone).group.coordinator
-            c = sonos.get_current_track_info().copy()
-            state = sonos.get_current_transport_info()['current_transport_state']
-            c['state'] = state
-            if 'album_art' in playing:
-                c['album_art2'] = playing['album_art']
-            message = json.dumps(c)
-        elif self.path == '/queuedepth':
-            # Give Internal Stats
-            message = json.dumps({"queuedepth": len(musicqueue)})
-        elif self.path== '/state':
-            s = {}
-            s['state'] = state
-            s['zone'] = zone
-            s['repeat'] = repeat
-            s['shuffle'] = shuffle
-            s['volume'] = sonos.group.volume
-            message = json.dumps(s)
-        elif self.path == '/speakers':
-            # List of Sonos Speakers
-            if zone is None:
-                sonos = list(soco.discover())[0]
-                sonos = sonos.group.coordinator
-                zone = sonos.ip_address
+    # API route handlers - each returns the JSON response body as bytes
+    # or, for large lists, as a tojson_stream() generator of bytes chunks
+
+    def _current(self):
+        # What is currently playing
+        global sonos, state
+        get_sonos()
+        sonos = get_coordinator(zone)
+        c = sonos.get_current_track_info().copy()
+        state = sonos.get_current_transport_info()['current_transport_state']
+        c['state'] = state
+        if 'album_art' in playing:
+            c['album_art2'] = playing['album_art']
+        return tojson(c)
+
+    def _queuedepth(self):
+        # Give Internal Stats
+        return tojson({"queuedepth": len(musicqueue)})
+
+    def _state(self):
+        s = {}
+        sonos = get_sonos()
+        s['state'] = state
+        s['zone'] = zone
+        s['repeat'] = repeat
+        s['shuffle'] = shuffle
+        s['volume'] = get_volume(sonos)
+        return tojson(s)
+
+    def _speakers(self):
+        # List of Sonos Speakers - rediscovered at most every SPEAKERSTTL
+        with _speakers_lock:
+            if (_speakers_cache['data'] is not None and
+                    time.time() - _speakers_cache['ts'] < SPEAKERSTTL):
+                return _speakers_cache['data']
+            get_sonos()
+            members = soco.SoCo(zone).group.members
             speakers = {}
             for z in soco.discover():
                 speakers[z.player_name] = {}
                 speakers[z.player_name]["ip"] = z.ip_address
-                speakers[z.player_name]["coordinator"] = soco.SoCo(z.ip_address).group.coordinator == soco.SoCo(z.ip_address)
-                soco.SoCo("10.0.1.183").group.members
-                member = soco.SoCo(z.ip_address) in soco.SoCo(zone).group.members
-                speakers[z.player_name]["state"] = member
+                speakers[z.player_name]["coordinator"] = z.group.coordinator == z
+                speakers[z.player_name]["state"] = z in members
                 speakers[z.player_name]["volume"] = z.volume
-            message = json.dumps(speakers)
-        elif self.path.startswith('/speaker_vol/'):
-            # Set volume for a specific group
-            ip, updown = self.path.split('/speaker_vol/')[1].split('/')
-            if updown == "up":
-                vol = soco.SoCo(ip).volume + 1
-            else:
-                vol = soco.SoCo(ip).volume - 1
-            soco.SoCo(ip).ramp_to_volume(int(vol))
-            message = "OK"
-        elif self.path.startswith('/setzone/'):
-            zone = self.path.split('/setzone/')[1]
-            message = "OK"
-        elif self.path == '/stats':
-            # Give Internal Stats
-            serverstats['ts'] = int(time.time())
-            serverstats['mem'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
-            message = json.dumps(serverstats)
-        elif self.path == '/queue':
-            # Give Internal Stats
-            message = json.dumps(musicqueue)
-        elif self.path == '/queue/clear':
-            # Clear current queue
-            musicqueue = []
-        elif self.path== '/play':
-            stop = False
-            sonos.play()
-        elif self.path== '/pause':
-            stop = True
-            sonos.pause()
-        elif self.path== '/stop':
-            stop = True
+            _speakers_cache['data'] = tojson(speakers)
+            _speakers_cache['ts'] = time.time()
+            return _speakers_cache['data']
+
+    def _speaker_vol(self, arg):
+        # Set volume for a specific group
+        ip, updown = arg.split('/')
+        if updown == "up":
+            vol = soco.SoCo(ip).volume + 1
+        else:
+            vol = soco.SoCo(ip).volume - 1
+        soco.SoCo(ip).ramp_to_volume(int(vol))
+        _speakers_cache['data'] = None
+        _volume['value'] = None
+        return b"OK"
+
+    def _setzone(self, arg):
+        global zone
+        zone = arg
+        _speakers_cache['data'] = None
+        _coord_cache.clear()
+        _volume['value'] = None
+        return b"OK"
+
+    def _stats(self):
+        # Give Internal Stats
+        serverstats['ts'] = int(time.time())
+        serverstats['mem'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return tojson(serverstats)
+
+    def _queue(self):
+        # Give Internal Stats
+        return tojson_stream(list(musicqueue))
+
+    def _queue_clear(self):
+        # Clear current queue
+        musicqueue.clear()
+        return RESP_OK
+
+    def _play(self):
+        global stop
+        get_sonos().play()
+        # resuming - jukebox must not advance before PLAYING is reported
+        jukebox_reset("TRANSITIONING")
+        stop = False
+        return RESP_OK
+
+    def _pause(self):
+        global stop
+        stop = True
+        get_sonos().pause()
+        jukebox_reset()
+        return RESP_OK
+
+    def _stop(self):
+        global stop
+        stop = True
+        get_sonos().stop()
+        jukebox_reset()
+        return RESP_OK
+
+    def _volumeup(self):
+        sonos = get_sonos()
+        set_volume(sonos, get_volume(sonos) + 1)
+        return RESP_OK
+
+    def _volumedown(self):
+        sonos = get_sonos()
+        set_volume(sonos, get_volume(sonos) - 1)
+        return RESP_OK
+
+    def _next(self):
+        global stop, playing
+        sonos = get_sonos()
+        if len(musicqueue) > 0 :
+            # Have jukebox queue up next song
             sonos.stop()
-        elif self.path== '/volumeup':
-            sonos.group.volume = sonos.group.volume + 1
-        elif self.path== '/volumedown':
-            sonos.group.volume = sonos.group.volume - 1
-        elif self.path== '/next':
-            if len(musicqueue) > 0 :
-                # Have jukebox queue up next song
-                sonos.stop()
-                stop = False
-            else:
-                # Empty playlist, just send next command
-                sonos.next()
-                playing = {}
-                message = json.dumps({"Response": "Sent Next - Playlist Empty"})
-        elif self.path== '/prev':
-            if repeat and len(musicqueue) > 1:
-                   # Queue up next song
-                playing = musicqueue.pop
-                musicqueue.insert(0, song)
-                playing = musicqueue.pop
-                musicqueue.append(playing)
-                # Play it
-                sonos.play_uri(playing['path'])
-                stop = False
-            else:
-                if len(musicqueue) <= 1:
-                    message = json.dumps({"Response": "Playlist Empty"})
-                else:
-                    sonos.previous()
-        elif self.path=='/toggle/repeat':
-            repeat = not repeat
-        elif self.path=='/toggle/shuffle':
-            shuffle = not shuffle
-        elif self.path== '/rescan':
-            # rescan/rediscover sonos system zones
-            sonos = list(soco.discover())[0]
-            sonos = sonos.group.coordinator
-            zone = sonos.ip_address
-        elif self.path== '/sonos':
-            s = {}
-            s['household_id'] = sonos.household_id
-            s['uid'] = sonos.uid
-            message = json.dumps(s)
-        elif self.path=='/playing':
-            message = json.dumps(playing)
-        elif self.path == '/listm3u' or self.path == '/playlists':
-            # List all m3u files in M3UPATH
-            message = json.dumps(list_m3u(M3UPATH))
-        elif self.path.startswith('/showplaylist/'):
-            # Return full playlist payload - file specified in URI
-            playlistfile = self.path.split('/showplaylist/')[1]
-            playlistfile = requests.utils.unquote(playlistfile)
-            playlist = parse_m3u("{}/{}".format(M3UPATH,playlistfile))
-            message = json.dumps(playlist)
-        elif self.path.startswith('/playlist/'):
-            # Load playlist into queue - file in URI
-            # TODO: Add title and other details
-            playlistfile = self.path.split('/playlist/')[1]
-            playlistfile = requests.utils.unquote(playlistfile)
-            playlist = parse_m3u("{}/{}".format(M3UPATH,playlistfile))
-            songs = []
-            for item in playlist:
-                songs.append(item)
-            if shuffle:
-                random.shuffle(songs)
-            for item in songs:
-                song = {}
-                song['id'] = item['id']
-                song['title'] = item['title']
-                song['artist'] = item['artist']
-                song['length'] = item['length']
-                song['album'] = item['album']
-                song['albumartist'] = item['albumartist']
-                song['path'] = "http://%s:%d%s" % (MEDIAHOST,
-                    MEDIAPORT, requests.utils.quote(item['path']))
-                album_art = None
-                if item['akey'] and os.path.isfile("%s/album-art/%s.png" % (MEDIAPATH, item['akey'])):
-                    album_art = "http://%s:%d/album-art/%s.png" % (MEDIAHOST,
-                        MEDIAPORT, item['akey'])
-                song['album_art'] = album_art
-                song['akey'] = item['akey']
-                song['skey'] = item['skey']
-                musicqueue.append(song)
-            message = json.dumps({"Response": "Added {} Songs".format(len(songs))})
-        elif self.path.startswith('/playfile/'):
-            # Load single song into queue - file in URI
-            # TODO: Add other details
-            playfile = self.path.split('/playfile/')[1]
-            song = {}
-            #fn = requests.utils.unquote(self.path.split('/play_file/')[1])
-            print("Add PlayFile: {}".format(playfile))
-            song['path'] = "http://%s:%d/%s" % (MEDIAHOST, MEDIAPORT, playfile)
-            musicqueue.append(song)
-            message = json.dumps({"Response": "Added 1 Song"})
-        # TODO
-        # elif self.path == '/select/albums':
-        elif self.path.startswith("/albumlist/"):
-            album_sel = self.path.split('/albumlist/')[1]
-            albums = []
-            for item in db_albums:
-                if album_sel != '' and (item[:len(album_sel)].lower() != album_sel.lower()):
-                    continue
-                for key in db_albums[item]:
-                    a = dict()
-                    a["key"] = key
-                    a["title"] = db[str(key)]["title"]
-                    a["thumbfile"] = db[str(key)]["thumbfile"]
-                    a["artist"] = db[str(key)]["artist"]
-                    a["added"] = db[str(key)]["added"]
-                    a["tracks"] = len(db[str(key)]["tracks"])
-                    albums.append(a)
-            message = json.dumps(albums)
-        elif self.path.startswith("/album/"):
-            album_id = self.path.split('/album/')[1]
-            if album_id.isdigit() and str(album_id) in db:
-                message = json.dumps(db[str(album_id)])
+            jukebox_reset()
+            stop = False
+        else:
+            # Empty playlist, just send next command
+            sonos.next()
+            playing = {}
+            return RESP_NEXT_EMPTY
+        return RESP_OK
+
+    def _prev(self):
+        global stop, playing
+        sonos = get_sonos()
+        if repeat and len(musicqueue) > 1:
+            # Requeue current song and back up to the previous one
+            song = musicqueue.pop()
+            musicqueue.appendleft(song)
+            playing = musicqueue.pop()
+            musicqueue.append(playing)
+            # Play it
+            sonos.play_uri(playing['path'])
+            jukebox_reset("TRANSITIONING")
+            stop = False
+        else:
+            if len(musicqueue) <= 1:
+                return RESP_PLAYLIST_EMPTY
             else:
-                message = json.dumps(None)
-        elif self.path == '/albums/recent':
-            # show last 50 recently added albums
-            albums = []
-            count = 0
-            for a in db_added:
-                count += 1
-                if count > 50:
-                    break
-                album_id = db_added[a]
+                sonos.previous()
+        return RESP_OK
+
+    def _toggle_repeat(self):
+        global repeat
+        repeat = not repeat
+        return RESP_OK
+
+    def _toggle_shuffle(self):
+        global shuffle
+        shuffle = not shuffle
+        return RESP_OK
+
+    def _rescan(self):
+        # rescan/rediscover sonos system zones
+        get_sonos(rescan=True)
+        _speakers_cache['data'] = None
+        _coord_cache.clear()
+        _volume['value'] = None
+        return RESP_OK
+
+    def _sonos(self):
+        sonos = get_sonos()
+        s = {}
+        s['household_id'] = sonos.household_id
+        s['uid'] = sonos.uid
+        return tojson(s)
+
+    def _playing(self):
+        return tojson(playing)
+
+    def _listm3u(self):
+        # List all m3u files in M3UPATH
+        return tojson(list_m3u(M3UPATH))
+
+    def _showplaylist(self, playlistfile):
+        # Return full playlist payload - file specified in URI
+        playlistfile = unquote(playlistfile)
+        playlist = parse_m3u("{}/{}".format(M3UPATH,playlistfile))
+        return tojson(playlist)
+
+    def _playlist(self, playlistfile):
+        # Load playlist into queue - file in URI
+        # TODO: Add title and other details
+        playlistfile = unquote(playlistfile)
+        playlist = parse_m3u("{}/{}".format(M3UPATH,playlistfile))
+        if shuffle:
+            random.shuffle(playlist)
+        mediaurl = get_mediaurl()
+        musicqueue.extend({
+            'id': item['id'],
+            'title': item['title'],
+            'artist': item['artist'],
+            'length': item['length'],
+            'album': item['album'],
+            'albumartist': item['albumartist'],
+            'path': mediaurl + quote(item['path']),
+            'album_art': album_art_url(item['akey']),
+            'akey': item['akey'],
+            'skey': item['skey'],
+        } for item in playlist)
+        return tojson({"Response": "Added {} Songs".format(len(playlist))})
+
+    def _playfile(self, playfile):
+        # Load single song into queue - file in URI
+        # TODO: Add other details
+        song = {}
+        #fn = unquote(self.path.split('/play_file/')[1])
+        log.debug("Add PlayFile: %s", playfile)
+        song['path'] = "http://%s:%d/%s" % (get_mediahost(), MEDIAPORT, playfile)
+        musicqueue.append(song)
+        return RESP_ADDED_ONE
+
+    # TODO
+    # def _select_albums(self):
+
+    def _albumlist(self, album_sel):
+        album_sel = album_sel.lower()
+        # titles starting with album_sel are a contiguous sorted slice
+        first = bisect.bisect_left(db_albums_lower, album_sel)
+        last = bisect.bisect_left(db_albums_lower, album_sel + '\U0010ffff')
+        return tojson_stream(self._albumlist_items(db_albums_sorted[first:last]))
+
+    def _albumlist_items(self, titles):
+        for item in titles:
+            for key in db_albums[item]:
+                album = db[str(key)]
+                a = dict()
+                a["key"] = key
+                a["title"] = album["title"]
+                a["thumbfile"] = album["thumbfile"]
+                a["artist"] = album["artist"]
+                a["added"] = album["added"]
+                a["tracks"] = len(album["tracks"])
+                yield a
+
+    def _album(self, album_id):
+        album = db.get(album_id) if album_id.isdigit() else None
+        if album is not None:
+            return tojson(album)
+        return RESP_NULL
+
+    def _albums_recent(self):
+        # show last 50 recently added albums - built by load_db()
+        return db_recent
+
+    def _albums_all(self):
+        # show all albums
+        return tojson_stream(self._albums_all_items())
+
+    def _albums_all_items(self):
+        for a in db_albums:
+            for album_id in db_albums[a]:
                 album = db[str(album_id)]
                 album["key"] = album_id
-                albums.append(album)
-            message = json.dumps(albums)
-        elif self.path == '/albums/all':
-            # show all albums
-            albums = []
-            count = 0
-            for a in db_albums:
-                for album_id in db_albums[a]:
-                    album = db[str(album_id)]
-                    album["key"] = album_id
-                    albums.append(album)
-            message = json.dumps(albums)
-        elif self.path.startswith("/albumadd/"):
-            album_id = self.path.split('/albumadd/')[1]
-            if album_id.isdigit() and str(album_id) in db:
-                # Load album of songs into queue - from db
-                akey = db[str(album_id)]["key"]
-                count = 0
-                for item in db[str(album_id)]["tracks"]:
-                    song = {}
-                    s = db[str(album_id)]["tracks"][item]
-                    song['title'] = s["song"]
-                    song['artist'] = s['artist']
-                    song['length'] = s['length']
-                    song['album'] = db[str(album_id)]['title']
-                    song['albumartist'] = db[str(album_id)]['artist']
-                    song['path'] = "http://%s:%d%s" % (MEDIAHOST,
-                        MEDIAPORT, requests.utils.quote(s['path'][0]))
-                    album_art = None
-                    if akey and os.path.isfile("%s/album-art/%s.png" % (MEDIAPATH, akey)):
-                        album_art = "http://%s:%d/album-art/%s.png" % (MEDIAHOST,
-                            MEDIAPORT, akey)
-                    song['album_art'] = album_art
-                    song['akey'] = akey
-                    song['skey'] = s["key"]
-                    musicqueue.append(song)
-                    count += 1
-                message = json.dumps({"Response": "Added %d Songs" % count})
+                yield album
 
+    def _albumadd(self, album_id):
+        songs = album_songs(album_id) if album_id.isdigit() else None
+        if songs is not None:
+            # Load album of songs into queue - from db
+            musicqueue.extend(songs)
+            return tojson({"Response": "Added %d Songs" % len(songs)})
+        return RESP_NULL
+
+    # Route tables - exact paths first, then prefixes (remainder passed in)
+    _EXACT = {
+        '/current': _current,
+        '/queuedepth': _queuedepth,
+        '/state': _state,
+        '/speakers': _speakers,
+        '/stats': _stats,
+        '/queue': _queue,
+        '/queue/clear': _queue_clear,
+        '/play': _play,
+        '/pause': _pause,
+        '/stop': _stop,
+        '/volumeup': _volumeup,
+        '/volumedown': _volumedown,
+        '/next': _next,
+        '/prev': _prev,
+        '/toggle/repeat': _toggle_repeat,
+        '/toggle/shuffle': _toggle_shuffle,
+        '/rescan': _rescan,
+        '/sonos': _sonos,
+        '/playing': _playing,
+        '/listm3u': _listm3u,
+        '/playlists': _listm3u,
+        '/albums/recent': _albums_recent,
+        '/albums/all': _albums_all,
+    }
+    _PREFIX = (
+        ('/speaker_vol/', _speaker_vol),
+        ('/setzone/', _setzone),
+        ('/showplaylist/', _showplaylist),
+        ('/playlist/', _playlist),
+        ('/playfile/', _playfile),
+        ('/albumlist/', _albumlist),
+        ('/album/', _album),
+        ('/albumadd/', _albumadd),
+    )
+
+    def do_GET(self):
+        self.send_response(200)
+        contenttype = 'application/json'
+        handler = self._EXACT.get(self.path)
+        try:
+            if handler is not None:
+                message = handler(self)
             else:
-                message = json.dumps(None)     
-        else:
-            # Serve static assets from web root first, if found.
-            fcontent, ftype = get_static(web_root, self.path)
-            if fcontent:
-                self.send_header('Content-type','{}'.format(ftype))
-                self.send_header('Content-Length', str(len(fcontent)))
-                self.end_headers()
-                self.wfile.write(fcontent)
-                return
-            else:
-                message = "404 Error"
-                print(self.path)
+                for prefix, handler in self._PREFIX:
+                    if self.path.startswith(prefix):
+                        message = handler(self, self.path[len(prefix):])
+                        break
+                else:
+                    # Serve static assets from web root first, if found.
+                    fcontent, ftype = get_static(web_root, self.path)
+                    if fcontent:
+                        self.send_header('Content-type','{}'.format(ftype))
+                        self.send_header('Content-Length', str(len(fcontent)))
+                        self.end_headers()
+                        self.wfile.write(fcontent)
+                        return
+                    message = b"404 Error"
+                    log.debug("404: %s", self.path)
+        except SonosUnavailable as e:
+            # no speakers (or discovery running) - answer now, don't hang
+            log.debug("Sonos unavailable: %s", e)
+            message = RESP_NO_SONOS
 
         # Counts 
-        if "Error" in message:
+        if isinstance(message, bytes) and b"Error" in message:
             serverstats['errors'] = serverstats['errors'] + 1
         serverstats['gets'] = serverstats['gets'] + 1
         """
@@ -569,96 +960,109 @@ class apihandler(BaseHTTPRequestHandler):
         """
         # Send headers and payload
         self.send_header('Content-type',contenttype)
+        if not isinstance(message, bytes):
+            # Streamed - HTTP/1.0 body ends when the connection closes
+            self.end_headers()
+            for chunk in message:
+                self.wfile.write(chunk)
+            return
         self.send_header('Content-Length', str(len(message)))
         self.end_headers()
-        self.wfile.write(bytes(message, "utf8"))
+        self.wfile.write(message)
 
 # Threads
 
-def sonoslisten():
+def jukebox():
     """
-    NOT USED YET
-    Thread to listen for Sonos events to reduce polling
+    Thread to manage playlist and Sonos Speakers - driven by avTransport
+    events from the coordinator, polling only if the subscription fails
     """
-    global running, musicqueue, state, repeat, shuffle, zone
+    global running, musicqueue, state, repeat, shuffle, zone, playing
     coordinator = None
+    sub = None
+    transport = None    # last known transport state of coordinator
+    heard = 0           # time of last event - poll again if silent too long
 
-    sonos = soco.SoCo(zone).group.coordinator
-    device = soco.discover().pop().group.coordinator
-    print (device.player_name)
-    sub = device.renderingControl.subscribe()
-    sub2 = device.avTransport.subscribe()
-
-    while True:
-        if zone != coordinator:
-            # switch to new zone?
-            coordinator = zone
-            print("SonosListen: switching to {} speakers".format(zone))
-            device = soco.SoCo(zone).group.coordinator
-            sub = device.renderingControl.subscribe()
-            sub2 = device.avTransport.subscribe()
-        try:
-            event = sub.events.get(timeout=0.5)
-            print (event.variables)
-            # {'volume': {'LF': '100', 'Master': '6', 'RF': '100'}}
-        except Empty:
-            pass
+    # wait for Sonos to show up on the network
+    delay = 1
+    while running:
         try:
-            event = sub2.events.get(timeout=0.5)
-            print (event.variables)
-            # 'transport_state': 'PAUSED_PLAYBACK
-            # 'transport_state': 'TRANSITIONING'
-            # 'transport_state': 'PLAYING'
-            # event.variables['transport_state']
-        except Empty:
-            pass
-
-        except KeyboardInterrupt:
-            sub.unsubscribe()
-            sub2.unsubscribe()
-            event_listener.stop()
+            get_sonos()
             break
-
-def jukebox():
-    """
-    Thread to manage playlist and Sonos Speakers
-    """
-    global running, musicqueue, state, repeat, shuffle, zone, playing
-    coordinator = None
+        except (SonosUnavailable, OSError) as e:
+            log.debug("Jukebox: %s - retry in %ds", e, delay)
+            time.sleep(delay)
+            delay = min(delay * 2, 10)
 
     while running:
-        if zone != coordinator:
-            # switch to new zone?
+        if zone != coordinator or (sub is not None and not sub.is_subscribed):
+            # switch to new zone (or renew lost subscription)
             coordinator = zone
             print("Jukebox: switching to {} speakers".format(zone))
-            sonos = soco.SoCo(zone).group.coordinator
+            sonos = get_coordinator(zone)
+            if sub is not None:
+                try:
+                    sub.unsubscribe()
+                except Exception:
+                    pass
+            try:
+                sub = sonos.avTransport.subscribe(auto_renew=True)
+            except Exception as e:
+                log.debug("Jukebox: subscribe failed, polling instead: %s", e)
+                sub = None
+            transport = None
+            heard = time.time()
+        if sub is not None:
+            # Wait for next transport state change
+            try:
+                event = sub.events.get(timeout=1)
+                transport = event.variables.get('transport_state', transport)
+                state = transport
+                heard = time.time()
+            except Empty:
+                if time.time() - heard > 60:
+                    transport = None
+                    heard = time.time()
+        else:
+            time.sleep(5)
+            transport = None
+        if _jukebox['reset']:
+            # play/pause/stop/next from the API - drop cached event state
+            _jukebox['reset'] = False
+            transport = _jukebox['transport']
+            heard = time.time()
         # Are there items in the queue?
         if len(musicqueue) > 0 and not stop:
-            # is it running?
-            state = sonos.get_current_transport_info()['current_transport_state']
-            print("STATE: Sonos {}".format(state), end="\r")
-            if state != "PLAYING":
+            # is it running? confirm with the speaker before advancing as
+            # an event may be older than the last API command
+            if transport not in ("PLAYING", "TRANSITIONING"):
+                transport = sonos.get_current_transport_info()['current_transport_state']
+                state = transport
+            log.debug("STATE: Sonos %s", transport)
+            if transport not in ("PLAYING", "TRANSITIONING"):
                 # Queue up next song
-                playing = musicqueue.pop(0)
+                playing = musicqueue.popleft()
                 if repeat:
                     musicqueue.append(playing)
                 # Play it
                 sonos.play_uri(playing['path'])
-                print("")
-        time.sleep(5)
+                transport = "TRANSITIONING"
+
+    if sub is not None:
+        sub.unsubscribe()
+    event_listener.stop()
 
 def api(port):
     """
     API Server - Thread to listen for commands on port 
     """
-    global running
+    global running, _api_server
     log.debug("Started API server thread on %d", port)
 
     with ThreadingHTTPServer(('', port), apihandler) as server:
+        _api_server = server
         try:
-            # server.serve_forever()
-            while running:
-                server.handle_request()
+            server.serve_forever()
         except:
             print(' CANCEL \n')
     print('\napi Exit')
@@ -667,20 +1071,30 @@ def media(port):
     """
     Media Server - Thread to listening for requests 
     """
-    global running
+    global running, _media_server
     log.debug("Started Media server thread on %d", port)
 
-    with ThreadingHTTPServer(('', port), mediahandler) as server:
+    with MediaHTTPServer(('', port), mediahandler) as server:
+        _media_server = server
         try:
-            # server.serve_forever()
-            while running:
-                server.handle_request()
+            server.serve_forever()
         except:
             print(' CANCEL \n')
     print('\nmedia Exit')
 
+def media_worker(port):
+    """
+    Media Server - Extra process sharing the media port (MEDIAPROCS > 1)
+    """
+    with MediaHTTPServer(('', port), mediahandler) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
 # MAIN Thread
 if __name__ == "__main__":
+    logging.basicConfig(level=LOGLEVEL)
     # creating thread
     apiServer = threading.Thread(target=api, args=(APIPORT,))
     mediaServer = threading.Thread(target=media, args=(MEDIAPORT,))
@@ -699,14 +1113,21 @@ if __name__ == "__main__":
     else:
         print("No song metabase data.")
 
+    # start extra media server processes - kernel balances connections
+    if MEDIAPROCS > 1 and hasattr(socket, "SO_REUSEPORT"):
+        print("Starting %d media server processes..." % (MEDIAPROCS - 1))
+        ctx = multiprocessing.get_context("spawn")
+        for _ in range(MEDIAPROCS - 1):
+            ctx.Process(target=media_worker, args=(MEDIAPORT,), daemon=True).start()
+
     # start threads
     print("Starting threads...")
     apiServer.start()
     mediaServer.start()
     jb.start()
 
-    print(" - API Endpoint on http://%s:%d" % (MEDIAHOST, APIPORT))
-    print(" - Media Endpoint on http://%s:%d" % (MEDIAHOST, MEDIAPORT))
+    print(" - API Endpoint on http://%s:%d" % (get_mediahost(), APIPORT))
+    print(" - Media Endpoint on http://%s:%d" % (get_mediahost(), MEDIAPORT))
 
     try:
         while(True):
@@ -714,8 +1135,9 @@ if __name__ == "__main__":
     except (KeyboardInterrupt, SystemExit):
         running = False
         # Close down threads
-        requests.get("http://%s:%d/stopthread" % (MEDIAHOST, APIPORT))
-        requests.get("http://%s:%d/stopthread" % (MEDIAHOST, MEDIAPORT))
+        for server in (_api_server, _media_server):
+            if server is not None:
+                server.shutdown()
         print("End")
 
     # threads completely executed
@@ -0,0 +1,68 @@
+# PackDB - Music Database Snapshot
+# -*- coding: utf-8 -*-
+"""
+Pack the exported Music Database JSON files into a single snapshot
+
+For more information see https://github.com/jasonacox/tinysonos
+
+Description
+    This tool reads the db.json and db.*.json index files created by
+    PlexExportSongs.py and writes them into one db.msgpack file. TinySonos
+    loads this snapshot at startup instead of parsing the six JSON files.
+    Re-run this tool after each export - an older snapshot is ignored.
+
+    There is one argument:
+        python3 PackDB.py <DB_Dir>
+
+        DB_Dir - Location of database files (MEDIAPATH for TinySonos)
+
+Requirements:
+    * msgpack (pip install msgpack)
+
+"""
+
+import os
+import sys
+import json
+import msgpack
+
+BUILD = "0.0.1"
+
+# Snapshot key and source file for each index
+DBFILES = {
+    "db": "db.json",
+    "added": "db.added.json",
+    "albums": "db.albums.json",
+    "artists": "db.artists.json",
+    "songs": "db.songs.json",
+    "songkey": "db.songkey.json",
+}
+
+def pack_db(dest="."):
+    """ Pack all database JSON files in dest into dest/db.msgpack
+    """
+    if dest.endswith("/"):
+        dest = dest[:-1]
+    data = dict()
+    for key in DBFILES:
+        print('Reading %s' % DBFILES[key])
+        with open("%s/%s" % (dest, DBFILES[key]), "rb") as fp:
+            data[key] = json.load(fp)
+    # write aside and rename so an interrupted run never leaves a
+    # truncated snapshot for TinySonos to load
+    dbfile = "%s/db.msgpack" % dest
+    with open(dbfile + ".tmp", 'wb') as fp:
+        fp.write(msgpack.packb(data))
+    os.replace(dbfile + ".tmp", dbfile)
+    print('Wrote %s' % dbfile)
+
+if __name__ == "__main__":
+    print("PackDB [{}] - Pack Music Database into Snapshot".format(BUILD))
+
+    if len(sys.argv) < 2:
+        print("\nUsage:  {} <DB_Dir>".format(sys.argv[0]))
+        print("")
+        print("    DB_Dir - Location of database files")
+        print("")
+    else:
+        pack_db(sys.argv[1])
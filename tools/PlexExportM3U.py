@@ -31,8 +31,53 @@ import requests
 import sys
 import plexapi
 from plexapi.server import PlexServer
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-BUILD = "0.0.1"
+BUILD = "0.0.2"
+THREADS = 8     # Playlists to export at the same time
+TIMEOUT = (5, 30)   # Plex connect and read timeouts in seconds
+
+def export_playlist(playlist, host, dest):
+    """ Export one audio playlist to dest/<title>.m3u8
+    """
+    lines = ['#EXTM3U\n']
+    lines.append('#TinySonos - PlexExportM3U [{}] - https://github.com/jasonacox/TinySonos/tree/main/tools\n'.format(BUILD))
+    lines.append('#{"playlistType": "%s", "title": "%s", "leafCount": "%s",  "server": "%s", "created": "%s"}\n' %
+        (playlist.playlistType, playlist.title,
+        playlist.leafCount, host,
+        playlist.updatedAt.strftime("%m/%d/%Y, %H:%M:%S"))
+    )
+    lines.append('#PLAYLIST:%s\n' % playlist.title)
+    lines.append('\n')
+    # export each song in playlist
+    songs = playlist.items()
+    for song in songs:  
+        # song and title details  
+        media = song.media[0]
+        seconds = int(song.duration / 1000)
+        title = song.title        
+        album = song.parentTitle
+        artist = song.originalTitle
+        albumArtist = song.grandparentTitle
+        if artist == None:
+            artist = albumArtist     
+        # album key comes with the track - only ask Plex if it is missing
+        albumKey = song.parentKey or song.album().key
+        lines.append('#PLEX ALBUM=%s,SONG=%s\n' % (albumKey.rpartition('metadata/')[2],song.key.rpartition('metadata/')[2])) 
+        lines.append('#EXTALB:%s\n' % album)
+        lines.append('#EXTART:%s\n' % albumArtist)  
+        # media file details
+        parts = media.parts
+        for part in parts:
+            lines.append('#EXTINF:%s,%s - %s\n' % (seconds, artist, title))
+            lines.append('%s\n' % part.file)
+            lines.append('\n')
+    # write whole playlist at once
+    filename = '%s/%s.%s' % (dest, playlist.title, "m3u8")
+    with open(filename, 'w', encoding="utf-8", buffering=1024*1024) as m3u:
+        m3u.writelines(lines)
+    return playlist
 
 def export_playlists(host, token, dest="."):
     """ Export all audio playlists on the given Plex server
@@ -40,53 +85,29 @@ def export_playlists(host, token, dest="."):
     if dest.endswith("/"):
         dest = dest[:-1]
     print('Connecting to plex...', end='')
+    # fail fast on a wrong host instead of waiting on OS TCP timeouts
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(max_retries=0, pool_maxsize=THREADS))
+    session.mount('https://', HTTPAdapter(max_retries=0, pool_maxsize=THREADS))
     try:
-        plex = PlexServer(host, token)
-    except (plexapi.exceptions.Unauthorized, requests.exceptions.ConnectionError):
+        plex = PlexServer(host, token, session=session, timeout=TIMEOUT)
+    except (plexapi.exceptions.Unauthorized, requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout):
         print(' failed')
         return
     print(' done')
 
     print('Getting playlists... ', end='')
     playlists = plex.playlists()
+    print(' done')
 
-    for playlist in playlists:
-        if (playlist.playlistType == 'audio'):
-            print('Exporting %s' % playlist.title)
-            m3u = open('%s/%s.%s' % (dest, playlist.title, "m3u8"), 'w', encoding="utf-8")
-            m3u.write('#EXTM3U\n')
-            m3u.write('#TinySonos - PlexExportM3U [{}] - https://github.com/jasonacox/TinySonos/tree/main/tools\n'.format(BUILD))
-            m3u.write('#{"playlistType": "%s", "title": "%s", "leafCount": "%s",  "server": "%s", "created": "%s"}\n' %
-                (playlist.playlistType, playlist.title,
-                playlist.leafCount, host,
-                playlist.updatedAt.strftime("%m/%d/%Y, %H:%M:%S"))
-            )
-            m3u.write('#PLAYLIST:%s\n' % playlist.title)
-            m3u.write('\n')
-            # export each song in playlist
-            songs = playlist.items()
-            print(' - %s songs' % playlist.leafCount)
-            for song in songs:  
-                # song and title details  
-                media = song.media[0]
-                seconds = int(song.duration / 1000)
-                title = song.title        
-                album = song.parentTitle
-                artist = song.originalTitle
-                albumArtist = song.grandparentTitle
-                if artist == None:
-                    artist = albumArtist     
-                m3u.write('#PLEX ALBUM=%s,SONG=%s\n' % (song.album().key.split('metadata/')[1],song.key.split('metadata/')[1])) 
-                m3u.write('#EXTALB:%s\n' % album)
-                m3u.write('#EXTART:%s\n' % albumArtist)  
-                # media file details
-                parts = media.parts
-                for part in parts:
-                    m3u.write('#EXTINF:%s,%s - %s\n' % (seconds, artist, title))
-                    m3u.write('%s\n' % part.file)
-                    m3u.write('\n')
-            # close file
-            m3u.close()
+    # export playlists in parallel - each one waits mostly on Plex requests
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        jobs = [pool.submit(export_playlist, playlist, host, dest)
+                for playlist in playlists if playlist.playlistType == 'audio']
+        for job in as_completed(jobs):
+            playlist = job.result()
+            print('Exported %s - %s songs' % (playlist.title, playlist.leafCount))
 
 print("PlexExportM3U [{}] - Export M3U Playlists from Plex")
 
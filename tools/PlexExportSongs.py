@@ -11,14 +11,18 @@ Description
     This tool connects to your Plex Music Database and Album Art
 
     There are two arguments required:
-        python3 PlexExportSongs.py <Plex_Host> <Plex_Token> <Dest_Dir>
+        python3 PlexExportSongs.py <Plex_Host> <Plex_Token> <Dest_Dir> [--no-cache]
 
         Plex_Host - Base URL for Plex Server
         Plex_Token - see https://support.plex.tv/articles/204059436-finding-an-authentication-token-x-plex-token/
         Dest_Dir - Location to store m3u8 files
+        --no-cache - Ignore Plex responses cached by a previous run
 
 Requirements:
     * plexapi (pip install plexapi)
+    * requests-cache (optional - pip install requests-cache)
+    * orjson (optional - pip install orjson)
+    * msgpack (optional - pip install msgpack)
 
 """
 
@@ -26,20 +30,93 @@ import requests
 import sys
 import plexapi
 from plexapi.server import PlexServer
-import urllib.request
 import os
+import shutil
 import json
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+try:
+    from requests_cache import CachedSession
+except ImportError:
+    CachedSession = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    from PackDB import pack_db  # needs msgpack
+except ImportError:
+    pack_db = None
 
-BUILD = "0.0.1"
+BUILD = "0.0.2"
+THREADS = 16    # Album art downloads at the same time
+CACHEHOURS = 12 # Reuse Plex responses cached within this many hours
 
-def export_songs(host, token, dest="."):
+def fetch_thumb(session, url, localfile, validators=None):
+    """ Download album art from url into localfile unless it is unchanged
+        since validators (ETag and Last-Modified of the last download)
+        - returns validators for the file now on disk
+    """
+    headers = dict()
+    if validators and os.path.exists(localfile):
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("modified"):
+            headers["If-Modified-Since"] = validators["modified"]
+    with session.get(url, headers=headers, stream=True, timeout=30) as r:
+        if r.status_code == 304:
+            return validators
+        r.raise_for_status()
+        r.raw.decode_content = True
+        with open(localfile, 'wb') as fp:
+            shutil.copyfileobj(r.raw, fp, 65536)
+        return {"etag": r.headers.get("ETag"),
+                "modified": r.headers.get("Last-Modified")}
+
+def write_json(filename, data):
+    """ Write data to filename as JSON - using orjson if installed
+    """
+    if orjson:
+        with open(filename, 'wb') as fp:
+            fp.write(orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(filename, 'w') as fp:
+            json.dump(data, fp)
+
+def add_index(index, name, uid):
+    """ Add album uid to the list for name in index - once per album
+    """
+    uids = index.setdefault(name, [])
+    # tracks of an album are added together so a repeat can only be last
+    if not uids or uids[-1] != uid:
+        uids.append(uid)
+
+def track_order(track):
+    """ Sort key for tracks of an album - disc number then track number
+    """
+    return (int(track.parentIndex or 0), int(track.index or 0))
+
+def export_songs(host, token, dest=".", cache=True):
     """ Export all song library on the given Plex server
     """
     if dest.endswith("/"):
         dest = dest[:-1]
+    # cache Plex metadata requests on disk if requests-cache is installed
+    session = None
+    if CachedSession:
+        expire = timedelta(hours=CACHEHOURS) if cache else 0
+        # kept in the working directory, not dest (served by TinySonos), and
+        # without the token so it is never written to disk
+        session = CachedSession("plex_cache", expire_after=expire,
+                                allowable_methods=['GET'],
+                                ignored_parameters=['X-Plex-Token'],
+                                # plexapi pages results with these headers
+                                match_headers=['X-Plex-Container-Start',
+                                               'X-Plex-Container-Size'])
     print('Connecting to plex...', end='')
     try:
-        plex = PlexServer(host, token)
+        plex = PlexServer(host, token, session=session)
     except (plexapi.exceptions.Unauthorized, requests.exceptions.ConnectionError):
         print(' failed')
         return
@@ -50,106 +127,126 @@ def export_songs(host, token, dest="."):
     idx_album = dict()
     idx_song = dict()
     idx_artist = dict()
-    idx_added = dict()
+    idx_added = list()
     idx_songkey = dict()
     m = plex.library.section('Music')
 
     allalbums = m.albums() # all albums
     #allalbums = m.recentlyAddedAlbums() # only recent 
+    print(' done')
+
+    # fetch every track at once and group them by album
+    print('Getting tracks... ', end='')
+    albumtracks = dict()
+    for track in m.searchTracks():
+        albumtracks.setdefault(track.parentRatingKey, []).append(track)
+    print(' done')
 
     # spot to store album art
     path = "%s/album-art" % dest
     isExist = os.path.exists(path)
     if not isExist:
         os.makedirs(path)
+    # validators of album art from the last export - skip unchanged images
+    etagfile = "%s/.etag.json" % path
+    try:
+        with open(etagfile) as fp:
+            etags = json.load(fp)
+    except (OSError, ValueError):
+        etags = dict()
+
+    # album art is downloaded in the background while albums are read
+    pool = ThreadPoolExecutor(max_workers=THREADS)
+    thumbs = dict()
+    # keep-alive connections shared by the download threads
+    artsession = requests.Session()
+    artsession.mount('http://', HTTPAdapter(pool_maxsize=THREADS))
+    artsession.mount('https://', HTTPAdapter(pool_maxsize=THREADS))
 
     # loop through every album
     uid = 0
     for album in allalbums:
-        uid = int(album.key.split("metadata/")[1])
+        uid = int(album.key.rpartition('metadata/')[2])
         # print (album.key)
         db[uid] = dict()
         db[uid]["title"] = album.title
-        if album.title not in idx_album:
-            idx_album[album.title] = [uid]
-        else:
-            idx_album[album.title].append(uid)
+        add_index(idx_album, album.title, uid)
         #db[uid]["thumbUrl"] = album.thumbUrl
         thumbUrl = album.thumbUrl
         localfile = "%s/album-art/%d.png" % (dest,uid)
         # print("  - copy {}".format(thumbUrl))
         if thumbUrl:
-            response = urllib.request.urlretrieve(thumbUrl, localfile)
+            thumbs[uid] = pool.submit(fetch_thumb, artsession, thumbUrl, localfile,
+                                      etags.get(str(uid)))
             db[uid]["thumbfile"] = localfile
         else:
             db[uid]["thumbfile"] = None
-        db[uid]["artist"] = album.artist().title
+        db[uid]["artist"] = album.parentTitle
         db[uid]["added"] = album.addedAt.timestamp()
-        idx_added[album.addedAt.timestamp()] = uid
+        idx_added.append((album.addedAt.timestamp(), uid))
         index = 0
-        indexarray = [0]
+        lastindex = 0   # highest track number so far
         tracks = dict()
-        for track in album.tracks():
+        for track in sorted(albumtracks.get(album.ratingKey, []), key=track_order):
             if track.index:
                 index = int(track.index)
             else:
-                index = max(indexarray) + 1
-            indexarray.append(index)
+                index = lastindex + 1
+            lastindex = max(lastindex, index)
             tracks[index] = dict()
             tracks[index]["song"] = track.title
             tracks[index]["path"] = track.locations
             tracks[index]["length"] = int(track.duration / 1000)
-            key = track.key.split('metadata/')[1]
+            key = track.key.rpartition('metadata/')[2]
             tracks[index]["key"] = key
-            artist = track.artist().title
+            artist = track.grandparentTitle
             tracks[index]["artist"] = artist
-            if track.title not in idx_song:
-                idx_song[track.title] = [uid]
-            elif uid not in idx_song[track.title]:
-                idx_song[track.title].append(uid)
-            if artist not in idx_artist:
-                idx_artist[artist] = [uid]
-            elif uid not in idx_artist[artist]:
-                idx_artist[artist].append(uid)
-            if key not in idx_songkey:
-                idx_songkey[key] = [uid]
-            elif uid not in idx_songkey[key]:
-                idx_songkey[key].append(uid)
+            add_index(idx_song, track.title, uid)
+            add_index(idx_artist, artist, uid)
+            add_index(idx_songkey, key, uid)
         db[uid]["tracks"] = tracks
-        print("{} - {}- {} - {} tracks - {}".format(uid,album.title,album.artist().title,len(tracks),track.locations))
+        print("{} - {}- {} - {} tracks - {}".format(uid,album.title,album.parentTitle,len(tracks),track.locations))
+
+    # wait for album art downloads
+    pool.shutdown(wait=True)
+    etags = dict()
+    for uid in thumbs:
+        if thumbs[uid].exception():
+            print("{} - album art failed: {}".format(uid, thumbs[uid].exception()))
+            db[uid]["thumbfile"] = None
+        else:
+            etags[str(uid)] = thumbs[uid].result()
+    with open(etagfile, 'w') as fp:
+        json.dump(etags, fp)
 
     # write the database
-    dbfile = "%s/db.json" % dest
-    with open(dbfile, 'w') as fp:
-        json.dump(db, fp)
-    dbfile = "%s/db.albums.json" % dest
-    with open(dbfile, 'w') as fp:
-        json.dump(idx_album, fp)
-    dbfile = "%s/db.songs.json" % dest
-    with open(dbfile, 'w') as fp:
-        json.dump(idx_song, fp)
-    dbfile = "%s/db.songkey.json" % dest
-    with open(dbfile, 'w') as fp:
-        json.dump(idx_songkey, fp)
-    dbfile = "%s/db.artists.json" % dest
-    with open(dbfile, 'w') as fp:
-        json.dump(idx_artist, fp)
-    temp = dict(sorted(idx_added.items(),reverse=True))
-    dbfile = "%s/db.added.json" % dest
-    with open(dbfile, 'w') as fp:
-        json.dump(temp, fp)
+    write_json("%s/db.json" % dest, db)
+    write_json("%s/db.albums.json" % dest, idx_album)
+    write_json("%s/db.songs.json" % dest, idx_song)
+    write_json("%s/db.songkey.json" % dest, idx_songkey)
+    write_json("%s/db.artists.json" % dest, idx_artist)
+    idx_added.sort(reverse=True)
+    write_json("%s/db.added.json" % dest, idx_added)
+    # single file snapshot that TinySonos loads instead of the JSON files
+    if pack_db:
+        pack_db(dest)
     
 
 print("PlexExportSongs [{}] - Export Music Database from Plex")
 
 print(len(sys.argv))
 
+cache = "--no-cache" not in sys.argv
+if not cache:
+    sys.argv.remove("--no-cache")
+
 if len(sys.argv) < 3:
-    print("\nUsage:  {} <Plex_Host> <Plex_Token> <Dest_Dir>".format(sys.argv[0]))
+    print("\nUsage:  {} <Plex_Host> <Plex_Token> <Dest_Dir> [--no-cache]".format(sys.argv[0]))
     print("")
     print("    Plex_Host - Base URL for Plex Server")
     print("    Plex_Token - see https://github.com/jasonacox/TinySonos/tree/main/tools")
     print("    Dest_Dir - Location to store database files")
+    print("    --no-cache - Ignore Plex responses cached by a previous run")
     print("")
 else:
     host = sys.argv[1]
@@ -161,5 +258,5 @@ else:
 
     print("Exporting Plex Music Database to {}".format(dest))
     print(" - Host: {}".format(host))
-    export_songs(host,token,dest)
+    export_songs(host,token,dest,cache)
 